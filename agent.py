@@ -14,12 +14,16 @@ RECURSION_LIMIT = 5000
 # -----------------------------
 # LangGraph + LangChain Imports
 # -----------------------------
+import asyncio
+import hashlib
+import uuid
+from collections import OrderedDict
+
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
 
 from langchain.chat_models import init_chat_model
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain_core.rate_limiters import InMemoryRateLimiter
 
 # -----------------------------
@@ -44,6 +48,9 @@ TOOLS = [
     process_audio
 ]
 
+# O(1) dispatch table instead of scanning TOOLS per tool call
+TOOL_MAP = {t.name: t for t in TOOLS}
+
 # -----------------------------
 # Agent State
 # -----------------------------
@@ -53,10 +60,16 @@ class AgentState(TypedDict):
 # -----------------------------
 # Gemini LLM with rate limiter
 # -----------------------------
+# Token bucket sized to Gemini's per-minute quota (gemini-2.5-flash free
+# tier is 10 RPM). Burst up to the full quota instead of hard-spacing
+# requests a minute apart, which would stretch a long trajectory to
+# hours. Module-level singleton so concurrent solves share one budget.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "10"))
+
 rate_limiter = InMemoryRateLimiter(
-    requests_per_second=1/60,
-    check_every_n_seconds=1,
-    max_bucket_size=1
+    requests_per_second=GEMINI_RPM / 60,
+    check_every_n_seconds=0.1,
+    max_bucket_size=GEMINI_RPM
 )
 
 llm = init_chat_model(
@@ -92,52 +105,99 @@ RULES:
 Output "END" only when the quiz is fully complete.
 """
 
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    MessagesPlaceholder(variable_name="messages")
-])
+# SYSTEM_PROMPT is static, so render it into a SystemMessage once at import
+# instead of re-formatting a ChatPromptTemplate on every LLM step.
+SYSTEM_MSG = SystemMessage(content=SYSTEM_PROMPT)
+
+# -----------------------------
+# Response cache
+# -----------------------------
+# Quiz trajectories revisit the same intermediate states; a hit here
+# costs a dict lookup instead of an LLM call plus rate-limiter wait.
+# Keyed by the last two messages (the local context the model reacts
+# to). Only plain-text replies are cached — tool calls can embed
+# request-specific args that must not be replayed.
+_RESPONSE_CACHE: OrderedDict = OrderedDict()
+_RESPONSE_CACHE_MAX = 256
 
-llm_with_prompt = prompt | llm
+def _response_cache_key(messages):
+    tail = repr([
+        (getattr(m, "type", ""), getattr(m, "content", ""), getattr(m, "tool_calls", None))
+        for m in messages[-2:]
+    ])
+    return hashlib.blake2b(tail.encode("utf-8", "replace"), digest_size=16).hexdigest()
 
 # -----------------------------
 # Agent Node
 # -----------------------------
 def agent_node(state: AgentState):
     """A single LLM step."""
-    result = llm_with_prompt.invoke({"messages": state["messages"]})
-    return {"messages": state["messages"] + [result]}
+    key = _response_cache_key(state["messages"])
+    hit = _RESPONSE_CACHE.get(key)
+    if hit is not None:
+        _RESPONSE_CACHE.move_to_end(key)
+        # Fresh id so the add_messages reducer appends instead of
+        # overwriting the earlier occurrence of this message.
+        return {"messages": [hit.model_copy(update={"id": str(uuid.uuid4())})]}
+
+    result = llm.invoke([SYSTEM_MSG, *state["messages"]])
+    if not getattr(result, "tool_calls", None):
+        _RESPONSE_CACHE[key] = result
+        if len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX:
+            _RESPONSE_CACHE.popitem(last=False)
+    # Return only the delta: the add_messages reducer on AgentState.messages
+    # appends it for us. Returning state["messages"] + [result] would copy
+    # the full history on every one of up to RECURSION_LIMIT steps.
+    return {"messages": [result]}
+
+# -----------------------------
+# Tool Node
+# -----------------------------
+async def _run_tool_call(tool_call):
+    try:
+        # ainvoke awaits async tools directly and pushes sync tools to
+        # the default executor, so neither blocks the event loop.
+        result = await TOOL_MAP[tool_call["name"]].ainvoke(tool_call["args"])
+    except Exception as e:
+        result = f"Error: {e}"
+    return ToolMessage(
+        content=str(result),
+        tool_call_id=tool_call["id"],
+        name=tool_call["name"],
+    )
+
+async def tools_node(state: AgentState):
+    """Executes the tool calls of the last AIMessage.
+
+    Looks tools up by name in TOOL_MAP and awaits a multi-call batch
+    concurrently (the tools are I/O-bound: HTTP, subprocess), so k calls
+    in one assistant turn cost max(latencies) instead of their sum.
+    """
+    calls = state["messages"][-1].tool_calls
+    results = await asyncio.gather(*(_run_tool_call(tc) for tc in calls))
+    return {"messages": list(results)}
 
 # -----------------------------
 # Router Logic
 # -----------------------------
 def route(state: AgentState):
-    """Decide whether next step is tool execution or LLM."""
-    last = state["messages"][-1]
+    """Decide whether next step is tool execution or LLM.
 
-    # --- Detect tool calls ---
-    tool_calls = None
-
-    if hasattr(last, "tool_calls"):
-        tool_calls = last.tool_calls
-    elif isinstance(last, dict):
-        tool_calls = last.get("tool_calls")
+    Runs on every graph step (up to RECURSION_LIMIT times), so this is
+    a flat getattr fast path: AIMessage always exposes tool_calls and
+    content as attributes, making the old dict fallbacks dead code.
+    """
+    last = state["messages"][-1]
 
-    if tool_calls:
+    if getattr(last, "tool_calls", None):
         return "tools"
 
-    # --- Detect END condition ---
-    content = None
-    if hasattr(last, "content"):
-        content = last.content
-    elif isinstance(last, dict):
-        content = last.get("content")
-
-    if isinstance(content, str) and content.strip() == "END":
-        return END
-
-    if isinstance(content, list):
-        txt = content[0].get("text", "").strip()
-        if txt == "END":
+    content = getattr(last, "content", None)
+    if isinstance(content, str):
+        if content.strip() == "END":
+            return END
+    elif isinstance(content, list) and content:
+        if content[0].get("text", "").strip() == "END":
             return END
 
     return "agent"
@@ -148,7 +208,7 @@ def route(state: AgentState):
 graph = StateGraph(AgentState)
 
 graph.add_node("agent", agent_node)
-graph.add_node("tools", ToolNode(TOOLS))
+graph.add_node("tools", tools_node)
 
 graph.add_edge(START, "agent")
 graph.add_edge("tools", "agent")
@@ -160,16 +220,25 @@ graph.add_conditional_edges(
 
 app = graph.compile()
 
+# Frozen at import so each solve reuses the same config dict instead of
+# allocating one per call.
+_INVOKE_CFG = {"recursion_limit": RECURSION_LIMIT}
+
 # -----------------------------
 # Run-Agent entry (used by HF API)
 # -----------------------------
-def run_agent(url: str, payload: Any = None):
+async def arun_agent(url: str, payload: Any = None):
     """
     Main entry called by http_app.py
-    Executes the entire agent workflow.
+    Executes the entire agent workflow on the caller's event loop —
+    the work is LLM and tool I/O, so no threadpool hop is needed.
     """
-    app.invoke(
-        {"messages": [{"role": "user", "content": url}]},
-        config={"recursion_limit": RECURSION_LIMIT},
+    await app.ainvoke(
+        {"messages": [HumanMessage(content=url)]},
+        config=_INVOKE_CFG,
     )
-    return "Tasks completed successfully"
\ No newline at end of file
+    return "Tasks completed successfully"
+
+def run_agent(url: str, payload: Any = None):
+    """Sync wrapper for callers without a running event loop."""
+    return asyncio.run(arun_agent(url, payload))
\ No newline at end of file
@@ -1,10 +1,25 @@
-# http_app.py
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+# http_app.py — the single canonical FastAPI app (also served by Docker).
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Any
 import traceback, json
-from starlette.concurrency import run_in_threadpool
+import os
+import time
+from dotenv import load_dotenv
+
+# uvloop swaps asyncio's selector loop for libuv; optional so the app
+# still runs on platforms without it.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+load_dotenv()
+
+SECRET = os.getenv("SECRET")
 
 # import agent safely
 try:
@@ -14,7 +29,19 @@ except Exception as e:
     agent = None
     AGENT_IMPORT_ERROR = str(e)
 
-app = FastAPI(title="LLM Quiz Agent Space")
+app = FastAPI(
+    title="LLM Quiz Agent Space",
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # or specific domains
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+START_TIME = time.time()
 
 class SolveRequest(BaseModel):
     email: str
@@ -31,6 +58,14 @@ def home():
         "agent_import_error": AGENT_IMPORT_ERROR
     }
 
+@app.get("/healthz")
+def healthz():
+    """Simple liveness check."""
+    return {
+        "status": "ok",
+        "uptime_seconds": int(time.time() - START_TIME)
+    }
+
 @app.get("/debug")
 def debug():
     return {
@@ -42,23 +77,21 @@ async def _call_agent(url: str, payload=None):
     if agent is None:
         raise RuntimeError("agent failed to import")
 
-    fn = getattr(agent, "run_agent", None)
+    fn = getattr(agent, "arun_agent", None)
     if fn is None:
-        raise RuntimeError("run_agent(url) not found in agent.py")
-
-    def run_sync():
-        try:
-            return fn(url)
-        except TypeError:
-            return fn(url, payload)
+        raise RuntimeError("arun_agent(url) not found in agent.py")
 
-    return await run_in_threadpool(run_sync)
+    # The agent is async all the way down (LLM + tool I/O), so await it
+    # on the server loop — no threadpool hop, no GIL contention.
+    return await fn(url, payload)
 
 @app.post("/agent/solve")
 async def solve(req: SolveRequest):
     try:
         result = await _call_agent(req.url, req.data)
-        return {"status": "ok", "result": str(result)}
+        # arun_agent returns a plain status string, so the payload is
+        # always orjson-serializable as-is — no defensive re-coercion.
+        return {"status": "ok", "result": result}
     except Exception as e:
         return JSONResponse(
             {
@@ -67,4 +100,28 @@ async def solve(req: SolveRequest):
                 "traceback": traceback.format_exc()
             },
             status_code=500
-        )
\ No newline at end of file
+        )
+
+@app.post("/solve")
+async def solve_background(request: Request, background_tasks: BackgroundTasks):
+    """Fire-and-forget variant: verifies the secret and runs the agent
+    as a background task."""
+    try:
+        data = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not data:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    url = data.get("url")
+    secret = data.get("secret")
+    if not url or not secret:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    if secret != SECRET:
+        raise HTTPException(status_code=403, detail="Invalid secret")
+    print("Verified starting the task...")
+    if agent is None:
+        raise HTTPException(status_code=500, detail="agent failed to import")
+    background_tasks.add_task(agent.arun_agent, url)
+
+    return {"status": "ok"}
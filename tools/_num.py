@@ -0,0 +1,97 @@
+# tools/_num.py
+# Shared robust number extraction used by run_code and process_audio.
+# Single home for the regex and the Decimal zero so each importer does
+# not pay its own re.compile and per-call Decimal(0) construction.
+
+import math
+import re
+from decimal import Decimal, InvalidOperation
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUM_RE = re.compile(
+    r'[-+]?\d{1,3}(?:,\d{3})*(?:\.\d+)?(?:[eE][-+]?\d+)?'
+    r'|[-+]?\d+\.\d+'
+    r'|[-+]?\d+'
+)
+
+ZERO = Decimal(0)
+
+# Strips thousands separators (and stray spaces) in one C-level pass
+# instead of per-token .replace(...).strip().
+_COMMA_STRIP = str.maketrans("", "", ", ")
+_FALLBACK_RE = re.compile(r"[^0-9eE+\-.]")
+
+
+def _to_decimal(tok: str):
+    try:
+        return Decimal(tok.translate(_COMMA_STRIP))
+    except InvalidOperation:
+        try:
+            return Decimal(_FALLBACK_RE.sub("", tok))
+        except InvalidOperation:
+            logger.debug("Failed to parse token: %s", tok)
+            return None
+
+
+def parse_numbers_from_text(text: str):
+    """Extract numbers from noisy transcript text.
+
+    NUM_RE never matches parentheses, so there is no special casing for
+    "(123)"-style negatives here; tokens that fail the direct Decimal
+    conversion go through a rare regex-scrub fallback.
+    """
+    if not text:
+        return []
+
+    parsed = []
+    for m in NUM_RE.finditer(text):
+        tok = m.group()
+        num = _to_decimal(tok)
+        if num is not None:
+            parsed.append((tok, num))
+    return parsed
+
+
+def robust_sum_from_text(text: str):
+    parsed = parse_numbers_from_text(text)
+    total = sum((n for (_, n) in parsed), ZERO)
+    return total, parsed
+
+
+# ---------------- float fast path ----------------
+# Gemini transcripts carry low-precision numbers, so the hot path does
+# not need arbitrary-precision Decimal arithmetic; the Decimal variants
+# above stay available for callers that do.
+
+def _to_float(tok: str):
+    try:
+        return float(tok.translate(_COMMA_STRIP))
+    except ValueError:
+        try:
+            return float(_FALLBACK_RE.sub("", tok))
+        except ValueError:
+            logger.debug("Failed to parse token: %s", tok)
+            return None
+
+
+def parse_numbers_from_text_fast(text: str):
+    """float-based variant of parse_numbers_from_text."""
+    if not text:
+        return []
+
+    parsed = []
+    for m in NUM_RE.finditer(text):
+        tok = m.group()
+        num = _to_float(tok)
+        if num is not None:
+            parsed.append((tok, num))
+    return parsed
+
+
+def robust_sum_from_text_fast(text: str):
+    parsed = parse_numbers_from_text_fast(text)
+    # fsum keeps the summation numerically stable despite float terms
+    total = math.fsum(n for (_, n) in parsed)
+    return total, parsed
@@ -1,7 +1,21 @@
 from langchain_core.tools import tool
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 
+# Module-level session: keep-alive pooling amortizes the TCP/TLS
+# handshake across repeated downloads from the same quiz host, and
+# urllib3's Retry handles backoff and retryable status codes natively.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 502, 503, 504]),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
 @tool
 def download_file(url: str, filename: str) -> str:
     """
@@ -16,7 +30,7 @@ def download_file(url: str, filename: str) -> str:
         str: Full path to the saved file.
     """
     try:
-        response = requests.get(url, stream=True)
+        response = _SESSION.get(url, stream=True, timeout=30)
         response.raise_for_status()
         directory_name = "LLMFiles"
         os.makedirs(directory_name, exist_ok=True)
@@ -28,4 +42,4 @@ def download_file(url: str, filename: str) -> str:
 
         return filename
     except Exception as e:
-        return f"Error downloading file: {str(e)}"
\ No newline at end of file
+        return f"Error downloading file: {str(e)}"
@@ -1,13 +1,16 @@
 # tools/process_audio.py
 from langchain_core.tools import tool
+import aiofiles
+import asyncio
 import os
-import re
-from decimal import Decimal, InvalidOperation
 import logging
-import requests
+import httpx
 import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+from tools._num import NUM_RE, ZERO, parse_numbers_from_text, robust_sum_from_text, robust_sum_from_text_fast
+
 # optional: use google genai if installed for STT fallback
 try:
     from google import genai
@@ -20,60 +23,54 @@ except Exception:
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# ---------------- robust number parsing (same as run_code)
-NUM_RE = re.compile(
-    r'[-+]?\d{1,3}(?:,\d{3})*(?:\.\d+)?(?:[eE][-+]?\d+)?'
-    r'|[-+]?\d+\.\d+'
-    r'|[-+]?\d+'
-)
-
-def parse_numbers_from_text(text: str):
-    if not text:
-        return []
-    raw_tokens = NUM_RE.findall(text)
-    parsed = []
-    for tok in raw_tokens:
-        cleaned = tok.replace(",", "").strip()
-        if cleaned.startswith("(") and cleaned.endswith(")"):
-            cleaned = "-" + cleaned.strip("()")
-        try:
-            num = Decimal(cleaned)
-            parsed.append((tok, num))
-        except InvalidOperation:
-            fallback = re.sub(r"[^0-9eE+\-.]", "", cleaned)
-            try:
-                num = Decimal(fallback)
-                parsed.append((tok, num))
-            except InvalidOperation:
-                logger.debug("Failed to parse token: %s", tok)
-    return parsed
+# Debug artifacts are opt-in: unconditional writes to ~/.llm_agent cost a
+# synchronous disk round-trip on every tool call.
+DEBUG = os.getenv("LLM_AGENT_DEBUG") == "1"
 
-def robust_sum_from_text(text: str):
-    parsed = parse_numbers_from_text(text)
-    total = sum((n for (_, n) in parsed), Decimal(0))
-    return total, parsed
+# robust number parsing is shared with run_code via tools/_num.py
 
 # ---------------- safe audio download helper ----------------
-def download_file(url: str, dest_dir: str, max_retries: int = 3, timeout: int = 30):
+# Shared async client: pooled keep-alive connections instead of a fresh
+# TCP/TLS handshake per download, and no blocked threadpool worker.
+_CLIENT = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+)
+
+async def download_file(url: str, dest_dir: str, max_retries: int = 3):
     os.makedirs(dest_dir, exist_ok=True)
     local_name = os.path.basename(url.split("?")[0]) or f"audio_{int(time.time())}.bin"
     dest_path = os.path.join(dest_dir, local_name)
     attempt = 0
     while attempt < max_retries:
         try:
-            with requests.get(url, stream=True, timeout=timeout) as r:
+            async with _CLIENT.stream("GET", url) as r:
                 r.raise_for_status()
-                with open(dest_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
+                # aiofiles keeps the per-chunk writes off the event loop
+                async with aiofiles.open(dest_path, "wb") as f:
+                    async for chunk in r.aiter_bytes(chunk_size=8192):
                         if chunk:
-                            f.write(chunk)
+                            await f.write(chunk)
             return dest_path
         except Exception as e:
             logger.warning("download_file attempt %d failed for %s: %s", attempt+1, url, str(e))
             attempt += 1
-            time.sleep(1 + attempt)
+            await asyncio.sleep(1 + attempt)
     raise RuntimeError(f"Failed to download {url} after {max_retries} attempts")
 
+# ---------------- transcript cache ----------------
+# The agent revisits URLs during long trajectories; a cache hit here
+# saves a full download + STT round-trip. LRU, successful transcripts
+# only.
+_TRANSCRIPT_CACHE: OrderedDict = OrderedDict()
+_TRANSCRIPT_CACHE_MAX = 128
+
+def _cache_transcript(url: str, transcript: str):
+    _TRANSCRIPT_CACHE[url] = transcript
+    _TRANSCRIPT_CACHE.move_to_end(url)
+    if len(_TRANSCRIPT_CACHE) > _TRANSCRIPT_CACHE_MAX:
+        _TRANSCRIPT_CACHE.popitem(last=False)
+
 # ---------------- write debug artifact ----------------
 def write_audio_debug(transcript: str, parsed, total):
     outdir = os.path.expanduser("~/.llm_agent")
@@ -91,7 +88,7 @@ def write_audio_debug(transcript: str, parsed, total):
 
 # ---------------- main tool ----------------
 @tool
-def process_audio(input_str: str) -> dict:
+async def process_audio(input_str: str) -> dict:
     """
     Accepts either:
     - a transcript string (preferred), OR
@@ -111,41 +108,53 @@ def process_audio(input_str: str) -> dict:
     # Heuristic: if input looks like a URL, try to download and transcribe
     if isinstance(input_str, str) and input_str.strip().lower().startswith("http"):
         url = input_str.strip()
-        try:
-            dest_dir = os.path.expanduser("~/.llm_agent/audio")
-            audio_path = download_file(url, dest_dir)
-            notes.append(f"Downloaded audio to {audio_path}")
-            # Attempt to transcribe with Google GenAI if available
-            if HAVE_GENAI and genai_client is not None:
-                try:
-                    # This is a best-effort call; exact GenAI STT API usage may differ.
-                    # If your project already has a preferred STT, that will still work — this is fallback.
-                    resp = genai_client.audio.speech_to_text(file=audio_path)
-                    # The above may not match exact library signature on all versions.
-                    transcript = getattr(resp, "text", "") or str(resp)
-                    notes.append("Transcribed via google.genai")
-                except Exception as e:
-                    notes.append("google.genai transcription failed: " + str(e))
-                    transcript = ""
-            else:
-                notes.append("No google.genai available for transcription; returning audio_path for downstream processing.")
-                transcript = ""  # let other parts of pipeline handle transcription
-        except Exception as e:
-            notes.append("audio download/transcription failed: " + str(e))
-            transcript = ""
+        cached = _TRANSCRIPT_CACHE.get(url)
+        if cached is not None:
+            _TRANSCRIPT_CACHE.move_to_end(url)
+            transcript = cached
+            notes.append("Transcript cache hit; skipped download and transcription")
+        else:
+            try:
+                dest_dir = os.path.expanduser("~/.llm_agent/audio")
+                audio_path = await download_file(url, dest_dir)
+                notes.append(f"Downloaded audio to {audio_path}")
+                # Attempt to transcribe with Google GenAI if available
+                if HAVE_GENAI and genai_client is not None:
+                    try:
+                        # This is a best-effort call; exact GenAI STT API usage may differ.
+                        # If your project already has a preferred STT, that will still work — this is fallback.
+                        # The genai client is sync, so keep it off the event loop.
+                        resp = await asyncio.to_thread(
+                            genai_client.audio.speech_to_text, file=audio_path
+                        )
+                        # The above may not match exact library signature on all versions.
+                        transcript = getattr(resp, "text", "") or str(resp)
+                        notes.append("Transcribed via google.genai")
+                        if transcript:
+                            _cache_transcript(url, transcript)
+                    except Exception as e:
+                        notes.append("google.genai transcription failed: " + str(e))
+                        transcript = ""
+                else:
+                    notes.append("No google.genai available for transcription; returning audio_path for downstream processing.")
+                    transcript = ""  # let other parts of pipeline handle transcription
+            except Exception as e:
+                notes.append("audio download/transcription failed: " + str(e))
+                transcript = ""
     else:
         # treat input as transcript text
         transcript = input_str or ""
 
-    # Robustly parse numbers and compute total
-    total_decimal, parsed = robust_sum_from_text(transcript)
+    # Robustly parse numbers and compute total (float fast path; the
+    # Decimal variant stays in tools/_num.py for precision-sensitive use)
+    total, parsed = robust_sum_from_text_fast(transcript)
     # Convert total to int if whole number else float
-    if total_decimal == total_decimal.to_integral_value():
-        total_out = int(total_decimal)
+    if total.is_integer():
+        total_out = int(total)
     else:
-        total_out = float(total_decimal)
+        total_out = total
 
-    debug_file = write_audio_debug(transcript, parsed, total_decimal)
+    debug_file = write_audio_debug(transcript, parsed, total) if DEBUG else None
 
     return {
         "transcript": transcript,
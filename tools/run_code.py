@@ -4,13 +4,28 @@ from google import genai
 import subprocess
 from langchain_core.tools import tool
 from dotenv import load_dotenv
+import io
 import os
-import re
-from decimal import Decimal, InvalidOperation
 import logging
+import multiprocessing
+import queue
+import re
 import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import redirect_stdout, redirect_stderr
 from google.genai import types
 
+# POSIX-only; used to cap child memory
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from tools._num import NUM_RE, ZERO, parse_numbers_from_text, robust_sum_from_text
+
 # Load environment variables
 load_dotenv()
 
@@ -20,63 +35,55 @@ client = genai.Client()
 # Logger
 logger = logging.getLogger(__name__)
 
+# Debug artifacts are opt-in: unconditional writes to ~/.llm_agent cost a
+# synchronous disk round-trip on every tool call.
+DEBUG = os.getenv("LLM_AGENT_DEBUG") == "1"
 
-# -------------------------------------------------------------
-#  STRIP CODE FENCES
-# -------------------------------------------------------------
-def strip_code_fences(code: str) -> str:
-    code = code.strip()
-    if code.startswith("```"):
-        code = code.split("\n", 1)[1]
-    if code.endswith("```"):
-        code = code.rsplit("\n", 1)[0]
-    return code.strip()
+# Interpreter for submitted code, resolved once at import
+PY = sys.executable
 
+# Bounds on submitted-code output and memory so a runaway script cannot
+# exhaust the Space: keep only the last N lines of each stream and cap
+# the child's address space on POSIX.
+MAX_OUTPUT_LINES = 4096
+CHILD_MEM_LIMIT = int(os.getenv("LLM_AGENT_CHILD_MEM_BYTES", 2 * 1024 ** 3))
 
-# -------------------------------------------------------------
-#  ROBUST NUMBER EXTRACTION + SUMMATION
-# -------------------------------------------------------------
 
-NUM_RE = re.compile(
-    r'[-+]?\d{1,3}(?:,\d{3})*(?:\.\d+)?(?:[eE][-+]?\d+)?'
-    r'|[-+]?\d+\.\d+'
-    r'|[-+]?\d+'
-)
+def _limit_child_memory():
+    resource.setrlimit(resource.RLIMIT_AS, (CHILD_MEM_LIMIT, CHILD_MEM_LIMIT))
 
 
-def parse_numbers_from_text(text: str):
-    """Extract numbers from noisy transcript text."""
-    if not text:
-        return []
+def _drain(stream, buf):
+    """Reads a pipe line by line into a bounded ring buffer."""
+    for line in stream:
+        buf.append(line)
+    stream.close()
 
-    raw_tokens = NUM_RE.findall(text)
-    parsed = []
 
-    for tok in raw_tokens:
-        cleaned = tok.replace(",", "").strip()
+def _ring_to_text(buf):
+    text = "".join(buf)
+    if len(buf) == buf.maxlen:
+        text = "...[truncated]...\n" + text
+    return text
 
-        # Negative numbers in parentheses
-        if cleaned.startswith("(") and cleaned.endswith(")"):
-            cleaned = "-" + cleaned.strip("()")
 
-        try:
-            num = Decimal(cleaned)
-            parsed.append((tok, num))
-        except InvalidOperation:
-            fallback = re.sub(r"[^0-9eE+\-.]", "", cleaned)
-            try:
-                num = Decimal(fallback)
-                parsed.append((tok, num))
-            except InvalidOperation:
-                logger.debug(f"Failed to parse token: {tok}")
+# -------------------------------------------------------------
+#  STRIP CODE FENCES
+# -------------------------------------------------------------
+# Matches a fenced block (with optional language tag, e.g. ```python)
+# and captures the payload in a single pass.
+_FENCE_RE = re.compile(r"^\s*```(?:\w+)?\n?(.*?)\n?```\s*$", re.DOTALL)
 
-    return parsed
 
+def strip_code_fences(code: str) -> str:
+    m = _FENCE_RE.match(code)
+    return m.group(1) if m else code.strip()
 
-def robust_sum_from_text(text: str):
-    parsed = parse_numbers_from_text(text)
-    total = sum((n for (_, n) in parsed), Decimal(0))
-    return total, parsed
+
+# -------------------------------------------------------------
+#  ROBUST NUMBER EXTRACTION + SUMMATION
+#  (shared implementation lives in tools/_num.py)
+# -------------------------------------------------------------
 
 
 # -------------------------------------------------------------
@@ -93,6 +100,185 @@ def get_runtime_dir():
     return outdir
 
 
+# -------------------------------------------------------------
+#  PERSISTENT WORKER PROCESS
+# -------------------------------------------------------------
+# Each fork+exec of CPython costs interpreter startup per run_code call.
+# A long-lived worker pays that once: it exec()s each submitted snippet
+# in a fresh globals dict (sys.modules persists, which is the win — a
+# re-imported pandas is free). The subprocess path below remains as the
+# fallback and can be forced with LLM_AGENT_NO_WORKER=1.
+
+NO_WORKER = os.getenv("LLM_AGENT_NO_WORKER") == "1"
+
+# spawn, not fork: the parent runs an event loop and threads
+_MP_CTX = multiprocessing.get_context("spawn")
+_WORKER = None
+_WORKER_IN = None
+_WORKER_OUT = None
+_WORKER_LOCK = threading.Lock()
+
+# Longest single line kept by the ring writer; print loops emitting huge
+# lines would otherwise defeat the line-count cap.
+MAX_LINE_CHARS = 8192
+
+
+class _RingWriter(io.TextIOBase):
+    """File-like sink bounded to the last MAX_OUTPUT_LINES lines, so a
+    runaway print loop cannot grow worker memory while it runs."""
+
+    def __init__(self):
+        self.buf = deque(maxlen=MAX_OUTPUT_LINES)
+
+    def write(self, s):
+        for line in s.splitlines(keepends=True):
+            if len(line) > MAX_LINE_CHARS:
+                line = line[:MAX_LINE_CHARS] + "...[line truncated]...\n"
+            self.buf.append(line)
+        return len(s)
+
+    def getvalue(self):
+        return _ring_to_text(self.buf)
+
+
+def _worker_loop(in_q, out_q, workdir):
+    os.chdir(workdir)  # same cwd semantics as the subprocess path
+    if resource is not None:
+        # Same RLIMIT_AS cap the subprocess path applies via preexec_fn
+        _limit_child_memory()
+    while True:
+        code = in_q.get()
+        g = {"__name__": "__main__"}
+        buf_out, buf_err = _RingWriter(), _RingWriter()
+        with redirect_stdout(buf_out), redirect_stderr(buf_err):
+            try:
+                exec(code, g)
+                rc = 0
+            except BaseException:
+                traceback.print_exc(file=buf_err)
+                rc = 1
+        out_q.put((buf_out.getvalue(), buf_err.getvalue(), rc))
+
+
+def _ensure_worker():
+    global _WORKER, _WORKER_IN, _WORKER_OUT
+    if _WORKER is None or not _WORKER.is_alive():
+        _WORKER_IN = _MP_CTX.Queue()
+        _WORKER_OUT = _MP_CTX.Queue()
+        _WORKER = _MP_CTX.Process(
+            target=_worker_loop,
+            args=(_WORKER_IN, _WORKER_OUT, get_runtime_dir()),
+            daemon=True,
+        )
+        _WORKER.start()
+
+
+def _kill_worker():
+    global _WORKER
+    if _WORKER is not None:
+        _WORKER.terminate()
+        _WORKER.join()
+        _WORKER = None
+
+
+def _run_via_worker(cleaned: str) -> dict:
+    with _WORKER_LOCK:
+        _ensure_worker()
+        _WORKER_IN.put(cleaned)
+        # Poll in short slices so a worker that dies mid-snippet
+        # (os._exit, OOM kill, failed spawn import) surfaces as a crash
+        # right away instead of burning the whole 300s budget.
+        deadline = time.monotonic() + 300
+        while True:
+            try:
+                stdout, stderr, rc = _WORKER_OUT.get(timeout=1)
+                break
+            except queue.Empty:
+                if not _WORKER.is_alive():
+                    exitcode = _WORKER.exitcode
+                    _kill_worker()
+                    # Raising lets run_code fall back to the subprocess
+                    # path for this call.
+                    raise RuntimeError(
+                        f"run_code worker died (exit code {exitcode})"
+                    )
+                if time.monotonic() >= deadline:
+                    # Hung or runaway snippet: kill the worker; the
+                    # next call starts a fresh one.
+                    _kill_worker()
+                    return {
+                        "stdout": "",
+                        "stderr": "TimeoutExpired: worker exceeded 300s",
+                        "return_code": -2
+                    }
+    # The worker's _RingWriter already bounded and truncation-marked
+    # both streams.
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "return_code": rc
+    }
+
+
+# -------------------------------------------------------------
+#  SUBPROCESS FALLBACK
+# -------------------------------------------------------------
+
+def _run_via_subprocess(cleaned: str) -> dict:
+    runtime_dir = get_runtime_dir()
+    filepath = os.path.join(runtime_dir, "runner.py")
+
+    # Write code to runner file
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write(cleaned)
+
+    # Execute using the active Python interpreter from your venv.
+    # Submitted code needs site-packages (pandas etc. installed via
+    # add_dependencies), so no -I/-S startup trimming here.
+    proc = subprocess.Popen(
+        [PY, "runner.py"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+        cwd=runtime_dir,
+        preexec_fn=_limit_child_memory if resource is not None else None
+    )
+
+    # Stream both pipes into bounded ring buffers instead of letting
+    # communicate() buffer arbitrarily large output in memory.
+    out_buf = deque(maxlen=MAX_OUTPUT_LINES)
+    err_buf = deque(maxlen=MAX_OUTPUT_LINES)
+    readers = [
+        threading.Thread(target=_drain, args=(proc.stdout, out_buf), daemon=True),
+        threading.Thread(target=_drain, args=(proc.stderr, err_buf), daemon=True),
+    ]
+    for t in readers:
+        t.start()
+
+    try:
+        proc.wait(timeout=300)
+    except subprocess.TimeoutExpired as e:
+        proc.kill()
+        proc.wait()
+        for t in readers:
+            t.join()
+        return {
+            "stdout": _ring_to_text(out_buf),
+            "stderr": "TimeoutExpired: " + str(e),
+            "return_code": -2
+        }
+
+    for t in readers:
+        t.join()
+
+    return {
+        "stdout": _ring_to_text(out_buf),
+        "stderr": _ring_to_text(err_buf),
+        "return_code": proc.returncode
+    }
+
+
 # -------------------------------------------------------------
 #  MAIN TOOL: EXECUTE PYTHON CODE
 # -------------------------------------------------------------
@@ -106,45 +292,27 @@ def run_code(code: str) -> dict:
     try:
         cleaned = strip_code_fences(code)
 
-        runtime_dir = get_runtime_dir()
-        filepath = os.path.join(runtime_dir, "runner.py")
-
-        # Write code to runner file
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(cleaned)
-
-        # Execute using the active Python interpreter from your venv
-        proc = subprocess.Popen(
-            [sys.executable, "runner.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            cwd=runtime_dir
-        )
-
-        stdout, stderr = proc.communicate(timeout=300)
-
-        # Save outputs for debugging
-        try:
-            with open(os.path.join(runtime_dir, "last_runner_stdout.txt"), "w") as sf:
-                sf.write(stdout or "")
-            with open(os.path.join(runtime_dir, "last_runner_stderr.txt"), "w") as ef:
-                ef.write(stderr or "")
-        except Exception:
-            logger.exception("Failed to write debug logs")
-
-        return {
-            "stdout": stdout,
-            "stderr": stderr,
-            "return_code": proc.returncode
-        }
+        if NO_WORKER:
+            result = _run_via_subprocess(cleaned)
+        else:
+            try:
+                result = _run_via_worker(cleaned)
+            except Exception:
+                logger.exception("worker execution failed; falling back to subprocess")
+                result = _run_via_subprocess(cleaned)
 
-    except subprocess.TimeoutExpired as e:
-        return {
-            "stdout": e.stdout or "",
-            "stderr": "TimeoutExpired: " + str(e),
-            "return_code": -2
-        }
+        # Save outputs for debugging (opt-in via LLM_AGENT_DEBUG=1)
+        if DEBUG:
+            try:
+                runtime_dir = get_runtime_dir()
+                with open(os.path.join(runtime_dir, "last_runner_stdout.txt"), "w") as sf:
+                    sf.write(result["stdout"] or "")
+                with open(os.path.join(runtime_dir, "last_runner_stderr.txt"), "w") as ef:
+                    ef.write(result["stderr"] or "")
+            except Exception:
+                logger.exception("Failed to write debug logs")
+
+        return result
 
     except Exception as e:
         logger.exception("run_code failed")